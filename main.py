@@ -11,19 +11,25 @@ Includes state management with sanity checks and rolling 3-day history.
 
 import os
 import sys
+import gzip
+import json
 import logging
 from pathlib import Path
 from datetime import datetime, timedelta
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json produces the same output
+    orjson = None
 
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent / "src"))
-
-from ingest import run_ingestion, ZILLOW_FAILED, REDFIN_FAILED, SCPA_FAILED
-from transform import run_transformation
-from deliver import deliver_report
+# Failure flags are reassigned inside ingest during the run, so read them as
+# ingest.X at call time rather than binding the import-time values
+from src import ingest
+from src.ingest import run_ingestion
+from src.transform import run_transformation
+from src.deliver import deliver_report
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +37,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# State directories, resolved relative to the repo root the pipeline runs from
+_DATA_DIR = Path("data")
+_HISTORY_DIR = _DATA_DIR / "history"
+
+# Snapshot files swept by the history cleanup
+HISTORY_SUFFIXES = ('.json', '.json.gz', '.csv')
+
+
+def dump_json(data) -> bytes:
+    """Serialize to 2-space indented JSON bytes, via orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, indent=2).encode('utf-8')
+
 
 def manage_history_state(metrics_data: dict, html_report: str = None) -> bool:
     """
@@ -48,41 +68,50 @@ def manage_history_state(metrics_data: dict, html_report: str = None) -> bool:
     """
     logger.info("Managing history state...")
     
-    history_dir = Path("data/history")
+    history_dir = _HISTORY_DIR
     history_dir.mkdir(parents=True, exist_ok=True)
     
-    today = datetime.now().strftime("%Y%m%d")
+    now = datetime.now()
+    today = now.strftime("%Y%m%d")
     
-    # Paths (V4: Only use JSON)
-    history_today = history_dir / f"history_{today}.json"
+    # Paths (V4: Only use JSON; dated snapshots are gzipped, latest stays plain)
+    history_today = history_dir / f"history_{today}.json.gz"
     history_latest = history_dir / "history.json"
     
-    # Report paths
-    report_today = history_dir / f"report_{today}.html"
+    # Report paths (dated archive is gzipped; report_latest stays browsable)
+    report_today = history_dir / f"report_{today}.html.gz"
     report_latest = history_dir / "report_latest.html"
     
-    # Save HTML report if provided
-    if html_report:
-        with open(report_today, 'w', encoding='utf-8') as f:
-            f.write(html_report)
-        with open(report_latest, 'w', encoding='utf-8') as f:
-            f.write(html_report)
-        logger.info(f"Saved HTML report to {report_today}")
-    
     # Save today's state
-    import json
+    import pandas as pd  # Only needed for the isinstance check below
     
     metrics_summary = {
         'run_date': today,
         'metric_counts': {k: len(v) if isinstance(v, pd.DataFrame) else 0 for k, v in metrics_data.items()}
     }
     
-    with open(history_today, 'w') as f:
-        json.dump(metrics_summary, f, indent=2)
+    # Serialize once, write both copies from the same buffer
+    payload = dump_json(metrics_summary)
+    writes = [
+        (history_today, gzip.compress(payload, compresslevel=6)),
+        (history_latest, payload),
+    ]
+    
+    # Save HTML report if provided
+    if html_report:
+        html_bytes = html_report.encode('utf-8')
+        writes += [
+            (report_today, gzip.compress(html_bytes, compresslevel=6)),
+            (report_latest, html_bytes),
+        ]
     
-    with open(history_latest, 'w') as f:
-        json.dump(metrics_summary, f, indent=2)
+    # The files are independent, so issue the writes concurrently;
+    # list() drains the iterator so any write error is raised here
+    with ThreadPoolExecutor(max_workers=len(writes)) as pool:
+        list(pool.map(lambda write: write[0].write_bytes(write[1]), writes))
     
+    if html_report:
+        logger.info(f"Saved HTML report to {report_today}")
     logger.info(f"Saved metrics summary to {history_today}")
     
     # Sanity check: For weekly data, just verify we have some metrics
@@ -93,18 +122,19 @@ def manage_history_state(metrics_data: dict, html_report: str = None) -> bool:
     logger.info(f"✅ Sanity check passed: Generated {len(metrics_data)} metrics")
     
     # Clean up old history files (keep only last 4 weeks)
-    for old_file in history_dir.glob("history_*.json"):
-        file_date_str = old_file.stem.replace("history_", "")
-        if len(file_date_str) == 8 and file_date_str.isdigit():
-            try:
-                file_date = datetime.strptime(file_date_str, "%Y%m%d")
-                days_old = (datetime.now() - file_date).days
-                
-                if days_old > 28:  # V4: 4 weeks instead of 3 days
-                    old_file.unlink()
-                    logger.info(f"Cleaned up old history: {old_file.name}")
-            except ValueError:
-                pass
+    # YYYYMMDD stamps order the same as integers, so no date parsing is needed
+    cutoff = int((now - timedelta(days=28)).strftime("%Y%m%d"))  # V4: 4 weeks instead of 3 days
+    # One directory scan covers every snapshot format: history_YYYYMMDD.json.gz,
+    # legacy .json, and V3-era .csv
+    with os.scandir(history_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.startswith("history_") or not name.endswith(HISTORY_SUFFIXES):
+                continue
+            file_date_str = name[len("history_"):].split(".")[0]
+            if len(file_date_str) == 8 and file_date_str.isdigit() and int(file_date_str) < cutoff:
+                os.unlink(entry.path)
+                logger.info(f"Cleaned up old history: {name}")
     
     return True
 
@@ -116,14 +146,12 @@ def calculate_stats(ingestion_success: bool, start_time: float) -> dict:
     Returns:
         dict: Stats for email footer
     """
-    from ingest import ZILLOW_FAILED, REDFIN_FAILED, SCPA_FAILED
-    
     execution_time = time.time() - start_time
     
     stats = {
-        'zillow_status': 'FAILED' if ZILLOW_FAILED else 'OK',
-        'redfin_status': 'FAILED' if REDFIN_FAILED else 'OK',
-        'scpa_status': 'FAILED' if SCPA_FAILED else 'OK',
+        'zillow_status': 'FAILED' if ingest.ZILLOW_FAILED else 'OK',
+        'redfin_status': 'FAILED' if ingest.REDFIN_FAILED else 'OK',
+        'scpa_status': 'FAILED' if ingest.SCPA_FAILED else 'OK',
         'execution_time': f"{execution_time:.1f}s"
     }
     
@@ -145,12 +173,12 @@ def main():
     ingestion_success = run_ingestion()
     
     # If all sources failed, send degraded mode email and exit
-    if ZILLOW_FAILED and REDFIN_FAILED and SCPA_FAILED:
+    if ingest.ZILLOW_FAILED and ingest.REDFIN_FAILED and ingest.SCPA_FAILED:
         logger.warning("All data sources failed - entering degraded mode")
         stats = calculate_stats(ingestion_success, start_time)
         deliver_report({}, stats, is_degraded=True)
         return 1
-    elif ZILLOW_FAILED or REDFIN_FAILED or SCPA_FAILED:
+    elif ingest.ZILLOW_FAILED or ingest.REDFIN_FAILED or ingest.SCPA_FAILED:
         logger.warning("Partial ingestion failure - some metrics may be unavailable")
     
     # Phase 2: Transformation
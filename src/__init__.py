@@ -0,0 +1 @@
+"""Sarasota Market Pulse — ETL pipeline package (ingest → transform → deliver)."""
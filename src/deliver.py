@@ -6,15 +6,18 @@ V4 Changes: Weekly market intelligence format with market-level analytics.
 """
 
 import os
+import re
+import atexit
+import socket
 import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
-from jinja2 import Template
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from markupsafe import Markup
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,725 +25,541 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 465
+
+# Template variable -> transform.py result key for each table section
+TABLE_SECTIONS = {
+    'price_pressure': 'price_pressure',
+    'inventory': 'inventory_absorption',
+    'trend_lines': 'trend_lines',
+    'buyer_value_index': 'buyer_value_index',
+    'zip_price_trends': 'zip_price_trends',
+    'assessment_ratio': 'assessment_ratio',
+    'investor_activity': 'investor_activity',
+}
+
+_FLIP_FORMATS = {
+    'first_sale_price': ('${:,.0f}', 'N/A'),
+    'second_sale_price': ('${:,.0f}', 'N/A'),
+    'markup_pct': ('{:+.1%}', 'N/A'),
+    'sqft': ('{:,.0f}', ''),
+    'beds': ('{:.0f}', ''),
+}
+
+# Display formats per table: column -> (format spec, placeholder when missing).
+# Each entry becomes a '<column>_fmt' string column before rendering.
+COLUMN_FORMATS = {
+    'price_pressure': {
+        'median_price': ('${:,.0f}', 'N/A'),
+        'price_delta': ('{:+.1%}', '—'),
+        'price_yoy': ('{:+.1%}', '—'),
+        'sale_to_list': ('{:.1%}', 'N/A'),
+    },
+    'inventory': {
+        'weeks_of_supply': ('{:.1f}', 'N/A'),
+        'supply_yoy': ('{:+.1%}', 'N/A'),
+        'new_listings': ('{:,.0f}', 'N/A'),
+        'homes_sold': ('{:,.0f}', 'N/A'),
+    },
+    'trend_lines': {
+        'zhvi': ('${:,.0f}', 'N/A'),
+        'zori': ('${:,.0f}', 'N/A'),
+        'flow_ratio': ('{:.2%}', 'N/A'),
+    },
+    'buyer_value_index': {
+        'median_sale_price': ('${:,.0f}', 'N/A'),
+        'avg_assessed': ('${:,.0f}', 'N/A'),
+        'value_ratio': ('{:.2f}x', 'N/A'),
+    },
+    'zip_price_trends': {
+        'price_now': ('${:,.0f}', 'N/A'),
+        'price_prior': ('${:,.0f}', 'N/A'),
+        'yoy_change': ('{:+.1%}', 'N/A'),
+    },
+    'assessment_ratio': {
+        'median_ratio': ('{:.2f}x', 'N/A'),
+    },
+    'profitable_flips': _FLIP_FORMATS,
+    'loss_flips': _FLIP_FORMATS,
+    'investor_activity': {
+        'investor_share': ('{:.0%}', 'N/A'),
+    },
+}
+
+# Figures quoted in the section insight boxes: output column -> (source column, scale, format spec).
+# Formatted like COLUMN_FORMATS (missing values become 'N/A') after multiplying by scale.
+INSIGHT_FORMATS = {
+    'inventory': {
+        'months_supply_fmt': ('weeks_of_supply', 1, '{:.0f}'),
+    },
+    'trend_lines': {
+        'rent_yield_fmt': ('flow_ratio', 1, '{:.1%}'),
+        'annual_rent_fmt': ('zori', 12, '${:,.0f}'),
+    },
+}
+
+# Market snapshot headline figures: key -> format spec. Each becomes '<key>_fmt'
+# when the value is present and non-zero (the template shows '—' otherwise).
+SNAPSHOT_FORMATS = {
+    'median_price': '${:,.0f}',
+    'weeks_supply': '{:.0f}',
+}
+
+# Label columns produced by transform.py itself (dates, fixed signal/state wording).
+# They are wrapped as Markup so autoescape passes them through; free text such as
+# flip addresses is deliberately not listed and stays escaped.
+TRUSTED_COLUMNS = {
+    'price_pressure': ('week', 'signal'),
+    'inventory': ('week', 'market_state'),
+    'trend_lines': ('month', 'direction'),
+    'buyer_value_index': ('buyer_signal',),
+    'assessment_ratio': ('meaning',),
+}
+
+# Badge colour per table: column -> (high cutoff, class above it, low cutoff, class below it).
+# Each entry becomes a '<column>_badge' class column (anything else, incl. NaN, is neutral)
+# and a '<column>_badge_html' Markup span wrapping the column's '_fmt' text.
+BADGE_CLASSES = {
+    'buyer_value_index': {'value_ratio': (1.3, 'badge-warning', 0.95, 'badge-success')},
+    'zip_price_trends': {'yoy_change': (0.05, 'badge-warning', -0.05, 'badge-down')},
+    'assessment_ratio': {'median_ratio': (1.2, 'badge-warning', 0.95, 'badge-success')},
+    'investor_activity': {'investor_share': (0.6, 'badge-warning', 0.3, 'badge-success')},
+}
+
+# Share bars: column -> max width in px. Each becomes a '<column>_bar' int column.
+BAR_WIDTHS = {
+    'investor_activity': {'investor_share': 100},
+}
+
+# Shared result for absent/empty tables (immutable, so safe to reuse)
+_NO_ROWS = ()
+
+# Rows shown per flip table (profitable / loss)
+MAX_FLIP_ROWS = 10
+
+# Degraded emails show only the tail of data/errors.log
+ERROR_LOG_TAIL_BYTES = 4096
+
+# Below this many rows, thread start-up costs more than the conversions
+PARALLEL_ROW_THRESHOLD = 5000
+
+
+# HTML Email Templates (V5 - Consumer-Friendly Redesign)
+# base.html holds the shared <head>/banner and pipeline-health footer;
+# email.html (weekly report) and degraded.html (error log only) extend it.
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+
+def _minify_css(css: str) -> str:
+    """Collapse whitespace in a stylesheet without changing any rule."""
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};:,])\s*', r'\1', css).replace(';}', '}').strip()
+
+
+# Jinja tags and comments; re.split keeps them at the odd indexes
+_JINJA_TAG = re.compile(r'(\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\})', re.S)
+
+
+def _minify_html(source: str) -> str:
+    """
+    Drop HTML comments and collapse runs of whitespace to a single space.
+    
+    Only the static markup between Jinja tags is touched, so string literals
+    inside {{ ... }} / {% ... %} keep their exact spacing.
+    """
+    parts = _JINJA_TAG.split(source)
+    for i in range(0, len(parts), 2):
+        static = re.sub(r'<!--.*?-->', '', parts[i], flags=re.S)
+        parts[i] = re.sub(r'\s+', ' ', static)
+    return ''.join(parts).strip()
 
-# HTML Email Template (V5 - Consumer-Friendly Redesign)
-EMAIL_TEMPLATE = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f0f4f8;
-        }
-        .header {
-            background: linear-gradient(135deg, #1a56db 0%, #1e7e5e 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 8px 8px 0 0;
-            text-align: center;
-        }
-        .header h1 {
-            margin: 0;
-            font-size: 28px;
-            letter-spacing: -0.5px;
-        }
-        .header p {
-            margin: 8px 0 0 0;
-            opacity: 0.85;
-            font-size: 15px;
-        }
-        .content {
-            background: white;
-            padding: 30px;
-            border-radius: 0 0 8px 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-        }
-        .metric-section {
-            margin: 30px 0;
-            border-left: 4px solid #1a56db;
-            padding-left: 20px;
-        }
-        .metric-section h2 {
-            margin-top: 0;
-            color: #1a56db;
-            font-size: 18px;
-        }
-        .section-teal { border-left-color: #0e9f6e; }
-        .section-teal h2 { color: #0e9f6e; }
-        .section-orange { border-left-color: #d03801; }
-        .section-orange h2 { color: #d03801; }
-        .section-green { border-left-color: #057a55; }
-        .section-green h2 { color: #057a55; }
-        .section-red { border-left-color: #c81e1e; }
-        .section-red h2 { color: #c81e1e; }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 15px 0;
-            font-size: 14px;
-        }
-        th {
-            background-color: #f3f4f6;
-            padding: 11px 12px;
-            text-align: left;
-            font-weight: 600;
-            border-bottom: 2px solid #e5e7eb;
-            font-size: 13px;
-        }
-        td {
-            padding: 10px 12px;
-            border-bottom: 1px solid #e5e7eb;
-            vertical-align: top;
-        }
-        tr:hover {
-            background-color: #f9fafb;
-        }
-        .footer {
-            margin-top: 30px;
-            padding: 20px;
-            background-color: #f3f4f6;
-            border-radius: 8px;
-            font-size: 13px;
-            color: #6b7280;
-        }
-        .footer strong {
-            color: #374151;
-        }
-        .no-data {
-            color: #9ca3af;
-            font-style: italic;
-            padding: 20px;
-            text-align: center;
-            background-color: #f9fafb;
-            border-radius: 4px;
-        }
-        .badge {
-            display: inline-block;
-            padding: 3px 8px;
-            border-radius: 4px;
-            font-size: 12px;
-            font-weight: 600;
-        }
-        .badge-success {
-            background-color: #def7ec;
-            color: #03543f;
-        }
-        .badge-warning {
-            background-color: #fef3c7;
-            color: #92400e;
-        }
-        .badge-danger {
-            background-color: #fde8e8;
-            color: #9b1c1c;
-        }
-        .badge-down {
-            background-color: #dbeafe;
-            color: #1e40af;
-        }
-        .badge-neutral {
-            background-color: #f3f4f6;
-            color: #4b5563;
-        }
-        .degraded-alert {
-            background-color: #fef3c7;
-            border-left: 4px solid #f59e0b;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 4px;
-        }
-        .degraded-alert h2 {
-            margin-top: 0;
-            color: #92400e;
-        }
-        .market-phase-banner {
-            background: linear-gradient(90deg, #eff6ff 0%, #f0fdf4 100%);
-            border: 1px solid #bfdbfe;
-            border-radius: 8px;
-            padding: 16px 20px;
-            margin: 0 0 24px 0;
-            text-align: center;
-        }
-        .market-phase-label {
-            font-size: 11px;
-            font-weight: 700;
-            text-transform: uppercase;
-            letter-spacing: 0.8px;
-            color: #6b7280;
-            margin-bottom: 4px;
-        }
-        .market-phase-value {
-            font-size: 20px;
-            font-weight: 700;
-            color: #1e3a5f;
-        }
-        .snapshot-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 12px 0 0 0;
-        }
-        .snapshot-cell {
-            width: 50%;
-            padding: 14px 16px;
-            background-color: #f9fafb;
-            border: 1px solid #e5e7eb;
-            vertical-align: top;
-        }
-        .snapshot-cell:first-child {
-            border-right: none;
-            border-radius: 6px 0 0 6px;
-        }
-        .snapshot-cell:last-child {
-            border-radius: 0 6px 6px 0;
-        }
-        .snapshot-label {
-            font-size: 11px;
-            font-weight: 700;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            color: #6b7280;
-            margin-bottom: 4px;
-        }
-        .snapshot-value {
-            font-size: 26px;
-            font-weight: 700;
-            color: #111827;
-            line-height: 1.1;
-        }
-        .snapshot-sub {
-            font-size: 12px;
-            color: #6b7280;
-            margin-top: 4px;
-        }
-        .insight-box {
-            background-color: #f9fafb;
-            border-left: 3px solid #9ca3af;
-            padding: 10px 14px;
-            margin: 12px 0 4px 0;
-            font-size: 13px;
-            color: #4b5563;
-            border-radius: 0 4px 4px 0;
-        }
-        .insight-box strong {
-            color: #1f2937;
-        }
-        .insight-orange {
-            border-left-color: #f59e0b;
-        }
-        .data-note {
-            font-size: 11px;
-            color: #9ca3af;
-            font-style: italic;
-        }
-        .prop-detail {
-            font-size: 12px;
-            color: #6b7280;
-            margin-top: 2px;
-        }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🏡 SRQ Pulse</h1>
-        <p>Sarasota Real Estate &mdash; Week of {{ date }}</p>
-    </div>
-
-    <div class="content">
-        {% if is_degraded %}
-        <div class="degraded-alert">
-            <h2>⚠️ Pipeline Degraded</h2>
-            <p>The data ingestion pipeline encountered errors. Some or all data may be unavailable for this week's report.</p>
-            <div style="background-color: #fff; padding: 15px; border-radius: 4px; margin-top: 15px; font-family: monospace; font-size: 12px;">
-                {{ error_log }}
-            </div>
-        </div>
-        {% else %}
-
-        <!-- MARKET SNAPSHOT -->
-        {% if market_snapshot %}
-        <div class="market-phase-banner">
-            <div class="market-phase-label">This Week's Market Condition</div>
-            <div class="market-phase-value">{{ market_snapshot.market_phase }}</div>
-        </div>
-
-        <div class="metric-section" style="border-left-color: #1a56db;">
-            <h2 style="color: #1a56db;">📋 Market Snapshot</h2>
-            <p style="color: #6b7280; font-size: 13px; margin-bottom: 0;">Key numbers for the week of {{ date }}</p>
-
-            <table class="snapshot-table">
-                <tr>
-                    <td class="snapshot-cell">
-                        <div class="snapshot-label">Median Sale Price</div>
-                        {% if market_snapshot.median_price %}
-                        <div class="snapshot-value">${{ "{:,.0f}".format(market_snapshot.median_price) }}</div>
-                        <div class="snapshot-sub">{{ market_snapshot.price_yoy_label }}</div>
-                        {% else %}
-                        <div class="snapshot-value">—</div>
-                        {% endif %}
-                    </td>
-                    <td class="snapshot-cell">
-                        <div class="snapshot-label">Months of Supply</div>
-                        {% if market_snapshot.weeks_supply %}
-                        <div class="snapshot-value">{{ "{:.0f}".format(market_snapshot.weeks_supply) }} mo</div>
-                        <div class="snapshot-sub">{{ market_snapshot.supply_label }}</div>
-                        {% else %}
-                        <div class="snapshot-value">—</div>
-                        {% endif %}
-                    </td>
-                </tr>
-            </table>
-
-            <div class="insight-box">
-                <strong>What this means:</strong> {{ market_snapshot.headline }}
-            </div>
-            {% if market_snapshot.hottest_zip %}
-            <div class="insight-box insight-orange">
-                <strong>Trending neighborhood:</strong> {{ market_snapshot.hottest_zip_label }}
-            </div>
-            {% endif %}
-            {% if market_snapshot.best_value_zip %}
-            <div class="insight-box">
-                <strong>Best value area:</strong> {{ market_snapshot.best_value_label }}
-            </div>
-            {% endif %}
-        </div>
-        {% endif %}
-
-        <!-- SECTION 1: ARE PRICES RISING OR FALLING? -->
-        <div class="metric-section">
-            <h2>📉 Are Prices Rising or Falling?</h2>
-            <p>Median sale price and how close homes are selling to asking price (last 4 weeks).</p>
-            {% if price_pressure|length > 0 %}
-            <table>
-                <thead>
-                    <tr>
-                        <th>Week</th>
-                        <th>Median Price</th>
-                        <th>Week-over-Week</th>
-                        <th>Year-over-Year</th>
-                        <th>Sale-to-List</th>
-                        <th>Signal</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in price_pressure %}
-                    <tr>
-                        <td>{{ row.week }}</td>
-                        <td><strong>${{ "{:,.0f}".format(row.median_price) if row.median_price else 'N/A' }}</strong></td>
-                        <td>{{ "{:+.1%}".format(row.price_delta) if (row.price_delta is not none and row.price_delta == row.price_delta) else '—' }}</td>
-                        <td>{{ "{:+.1%}".format(row.price_yoy) if row.price_yoy is not none else '—' }}</td>
-                        <td>{{ "{:.1%}".format(row.sale_to_list) if row.sale_to_list else 'N/A' }}</td>
-                        <td>{{ row.signal }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% set latest_pp = price_pressure[-1] %}
-            <div class="insight-box">
-                <strong>What to know:</strong>
-                {% if latest_pp.sale_to_list and latest_pp.sale_to_list < 0.97 %}
-                Homes are selling below asking price ({{ "{:.1%}".format(latest_pp.sale_to_list) }} of list on average). Buyers may have room to negotiate.
-                {% elif latest_pp.sale_to_list and latest_pp.sale_to_list > 1.0 %}
-                Homes are selling above asking price ({{ "{:.1%}".format(latest_pp.sale_to_list) }} of list). Expect competition and consider offering at or above list price.
-                {% else %}
-                Homes are selling near asking price. The market is fairly balanced right now.
-                {% endif %}
-            </div>
-            {% else %}
-            <div class="no-data">Price data unavailable this week (Redfin source failed)</div>
-            {% endif %}
-        </div>
-
-        <!-- SECTION 2: HOW MUCH HOUSING IS AVAILABLE? -->
-        <div class="metric-section section-teal">
-            <h2>📦 How Much Housing Is Available?</h2>
-            <p>Months of supply, new listings coming to market, and homes going under contract (last 4 weeks).</p>
-            {% if inventory|length > 0 %}
-            <table>
-                <thead>
-                    <tr>
-                        <th>Week</th>
-                        <th>Months of Supply</th>
-                        <th>YoY Change</th>
-                        <th>New Listings</th>
-                        <th>Homes Sold</th>
-                        <th>Market Condition</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in inventory %}
-                    <tr>
-                        <td>{{ row.week }}</td>
-                        <td><strong>{{ "{:.1f}".format(row.weeks_of_supply) if row.weeks_of_supply is not none else 'N/A' }}</strong></td>
-                        <td>{{ "{:+.1%}".format(row.supply_yoy) if row.supply_yoy is not none else 'N/A' }}</td>
-                        <td>{{ "{:,.0f}".format(row.new_listings) if row.new_listings else 'N/A' }}</td>
-                        <td>{{ "{:,.0f}".format(row.homes_sold) if row.homes_sold else 'N/A' }}</td>
-                        <td>{{ row.market_state }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% set latest_inv = inventory[0] %}
-            <div class="insight-box">
-                <strong>What to know:</strong>
-                {% if latest_inv.weeks_of_supply and latest_inv.weeks_of_supply > 18 %}
-                At {{ "{:.0f}".format(latest_inv.weeks_of_supply) }} months of supply, buyers have significant negotiating power — there are more homes available than buyers right now.
-                {% elif latest_inv.weeks_of_supply and latest_inv.weeks_of_supply < 8 %}
-                At only {{ "{:.0f}".format(latest_inv.weeks_of_supply) }} months of supply, homes are moving fast. Buyers should be prepared to act quickly.
-                {% else %}
-                The market has a relatively balanced amount of inventory.
-                {% endif %}
-                {% if latest_inv.new_listings and latest_inv.homes_sold %}
-                New listings ({{ "{:,.0f}".format(latest_inv.new_listings) }}) are {{ 'outpacing' if latest_inv.new_listings > latest_inv.homes_sold else 'below' }} homes sold ({{ "{:,.0f}".format(latest_inv.homes_sold) }}) this week.
-                {% endif %}
-            </div>
-            {% else %}
-            <div class="no-data">Inventory data unavailable this week (Redfin source failed)</div>
-            {% endif %}
-        </div>
-
-        <!-- SECTION 3: HOME VALUE & RENT TREND -->
-        <div class="metric-section section-teal">
-            <h2>📈 Sarasota Home Value &amp; Rent Trend</h2>
-            <p>How average home values and typical rents have moved over the past 6 months (county-wide).</p>
-            {% if trend_lines|length > 0 %}
-            <table>
-                <thead>
-                    <tr>
-                        <th>Month</th>
-                        <th>Avg. Home Value (Zillow)</th>
-                        <th>Typical Monthly Rent</th>
-                        <th>Rent-to-Value Ratio</th>
-                        <th>Trend</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in trend_lines %}
-                    <tr>
-                        <td>{{ row.month }}</td>
-                        <td>${{ "{:,.0f}".format(row.zhvi) }}</td>
-                        <td>${{ "{:,.0f}".format(row.zori) }}/mo</td>
-                        <td>{{ "{:.2%}".format(row.flow_ratio) }}</td>
-                        <td>{{ row.direction }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% set latest_tl = trend_lines[-1] %}
-            <div class="insight-box">
-                <strong>What this means:</strong>
-                A {{ "{:.1%}".format(latest_tl.flow_ratio) }} annual rent-to-value ratio means that for a typical
-                ${{ "{:,.0f}".format(latest_tl.zhvi) }} home, gross annual rent is roughly ${{ "{:,.0f}".format(latest_tl.zori * 12) }}.
-                This is a county-wide estimate — actual figures vary significantly by neighborhood.
-            </div>
-            {% else %}
-            <div class="no-data">Home value trend data unavailable (Zillow source failed)</div>
-            {% endif %}
-        </div>
-
-        <!-- SECTION 4: WHERE ARE HOMES PRICED FAIRLY? (Buyer Value Index) -->
-        <div class="metric-section section-orange">
-            <h2>🏘️ Where Are Homes Priced Fairly?</h2>
-            <p>Comparing recent median sale prices to county-assessed values by zip code (last 12 months, residential only).</p>
-            {% if buyer_value_index|length > 0 %}
-            <table>
-                <thead>
-                    <tr>
-                        <th>Zip</th>
-                        <th>Median Sale Price</th>
-                        <th>Avg. Assessed Value</th>
-                        <th>Sale vs. Assessed</th>
-                        <th>Buyer Signal</th>
-                        <th>Sales</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in buyer_value_index %}
-                    <tr>
-                        <td><strong>{{ row.zip }}</strong></td>
-                        <td>${{ "{:,.0f}".format(row.median_sale_price) }}</td>
-                        <td>${{ "{:,.0f}".format(row.avg_assessed) }}</td>
-                        <td>
-                            <span class="badge {% if row.value_ratio > 1.3 %}badge-warning{% elif row.value_ratio < 0.95 %}badge-success{% else %}badge-neutral{% endif %}">
-                                {{ "{:.2f}x".format(row.value_ratio) }}
-                            </span>
-                        </td>
-                        <td>{{ row.buyer_signal }}</td>
-                        <td class="data-note">{{ row.sales_volume }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            <div class="insight-box">
-                <strong>How to read this:</strong> A ratio above 1.0x means buyers are paying more than the county's assessed
-                value — common in active markets. Below 1.0x may indicate a softer neighborhood. County assessments
-                typically lag the market by 1–2 years, so this is a relative comparison, not an appraisal.
-            </div>
-            {% else %}
-            <div class="no-data">Buyer value data unavailable this week (county data required)</div>
-            {% endif %}
-        </div>
-
-        <!-- SECTION 5: PRICE CHANGES BY NEIGHBORHOOD -->
-        <div class="metric-section">
-            <h2>📍 Price Changes by Neighborhood (Year Over Year)</h2>
-            <p>Median sale price in each zip code — last 12 months vs. the year before. Residential sales only. Zips marked * have fewer than 20 sales (treat as directional only).</p>
-            {% if zip_price_trends|length > 0 %}
-            <table>
-                <thead>
-                    <tr>
-                        <th>Zip</th>
-                        <th>Current Median</th>
-                        <th>Prior Year Median</th>
-                        <th>YoY Change</th>
-                        <th>Sales</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in zip_price_trends %}
-                    <tr>
-                        <td><strong>{{ row.zip_display if row.zip_display else row.zip }}</strong></td>
-                        <td>${{ "{:,.0f}".format(row.price_now) }}</td>
-                        <td>${{ "{:,.0f}".format(row.price_prior) }}</td>
-                        <td>
-                            <span class="badge {% if row.yoy_change > 0.05 %}badge-warning{% elif row.yoy_change < -0.05 %}badge-down{% else %}badge-neutral{% endif %}">
-                                {{ "{:+.1%}".format(row.yoy_change) }}
-                            </span>
-                            {% if row.yoy_flag == 'low_data' %}<span class="data-note"> limited data</span>{% endif %}
-                        </td>
-                        <td class="data-note">{{ row.sales_volume }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            <div class="insight-box">
-                <strong>What to know:</strong> These are recorded county sales prices, not list prices or Zestimate estimates.
-                Orange badge = prices rose vs. last year. Blue badge = prices fell.
-                Large swings (like +40%) in low-volume zips may reflect a single unusual sale — look at the sales count.
-            </div>
-            {% else %}
-            <div class="no-data">Zip-level price trends unavailable (county data required)</div>
-            {% endif %}
-        </div>
-
-        <!-- SECTION 6: SALE PRICE VS. COUNTY ASSESSMENT -->
-        <div class="metric-section section-green">
-            <h2>📊 Are Sale Prices Above or Below County Assessments?</h2>
-            <p>The Sarasota County Property Appraiser assigns a value to each property. This shows how actual sale prices compare.</p>
-            {% if assessment_ratio|length > 0 %}
-            <table>
-                <thead>
-                    <tr>
-                        <th>Zip</th>
-                        <th>Median Ratio</th>
-                        <th>What It Means</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in assessment_ratio %}
-                    <tr>
-                        <td><strong>{{ row.zip }}</strong></td>
-                        <td>
-                            <span class="badge {% if row.median_ratio > 1.2 %}badge-warning{% elif row.median_ratio < 0.95 %}badge-success{% else %}badge-neutral{% endif %}">
-                                {{ "{:.2f}x".format(row.median_ratio) }}
-                            </span>
-                        </td>
-                        <td>{{ row.meaning }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            <div class="insight-box">
-                <strong>Context:</strong> County assessments typically lag market values by 1–2 years.
-                A ratio of 1.22x means homes are selling 22% above what the county assessed them at —
-                this is normal in an appreciating market. A ratio near or below 1.0x can signal cooling prices.
-            </div>
-            {% else %}
-            <div class="no-data">Assessment ratio data unavailable (county data required)</div>
-            {% endif %}
-        </div>
-
-        <!-- SECTION 7: FLIP ACTIVITY -->
-        <div class="metric-section section-red">
-            <h2>🔄 Flip Activity (Last 6 Months)</h2>
-            <p><strong>{{ flip_summary }}</strong> &mdash; properties bought and resold within 4–12 months.</p>
-
-            {% if profitable_flips|length > 0 %}
-            <h3 style="color: #057a55; margin-top: 20px; font-size: 15px;">Recent Profitable Flips</h3>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Property</th>
-                        <th>Purchased</th>
-                        <th>Sold</th>
-                        <th>Gain</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in profitable_flips[:10] %}
-                    <tr>
-                        <td>
-                            <strong>{{ row.address if row.address else 'Address unavailable' }}</strong>
-                            {% if row.sqft and row.sqft == row.sqft %}
-                            <div class="prop-detail">{{ "{:,.0f}".format(row.sqft) }} sqft{% if row.beds and row.beds == row.beds %}, {{ "{:.0f}".format(row.beds) }} bed{% endif %}</div>
-                            {% endif %}
-                        </td>
-                        <td>${{ "{:,.0f}".format(row.first_sale_price) }}<br><span class="data-note">{{ row.first_sale_date }}</span></td>
-                        <td>${{ "{:,.0f}".format(row.second_sale_price) }}<br><span class="data-note">{{ row.second_sale_date }}</span></td>
-                        <td><span class="badge badge-success">{{ "{:+.1%}".format(row.markup_pct) }}</span></td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% endif %}
-
-            {% if loss_flips|length > 0 %}
-            <h3 style="color: #9b1c1c; margin-top: 20px; font-size: 15px;">Recent Flips at a Loss</h3>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Property</th>
-                        <th>Purchased</th>
-                        <th>Sold</th>
-                        <th>Loss</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in loss_flips[:10] %}
-                    <tr>
-                        <td>
-                            <strong>{{ row.address if row.address else 'Address unavailable' }}</strong>
-                            {% if row.sqft and row.sqft == row.sqft %}
-                            <div class="prop-detail">{{ "{:,.0f}".format(row.sqft) }} sqft{% if row.beds and row.beds == row.beds %}, {{ "{:.0f}".format(row.beds) }} bed{% endif %}</div>
-                            {% endif %}
-                        </td>
-                        <td>${{ "{:,.0f}".format(row.first_sale_price) }}<br><span class="data-note">{{ row.first_sale_date }}</span></td>
-                        <td>${{ "{:,.0f}".format(row.second_sale_price) }}<br><span class="data-note">{{ row.second_sale_date }}</span></td>
-                        <td><span class="badge badge-danger">{{ "{:+.1%}".format(row.markup_pct) }}</span></td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% endif %}
-
-            {% if profitable_flips|length == 0 and loss_flips|length == 0 %}
-            <div class="no-data">No flips detected in the last 180 days</div>
-            {% endif %}
-
-            <div class="insight-box">
-                <strong>What flips tell us:</strong> Profitable flips indicate investors successfully adding value or
-                timing the market. Loss flips may signal overpriced purchases, renovation overruns, or softening
-                prices in that area. Data is from Sarasota County recorded Warranty Deed transactions.
-            </div>
-        </div>
-
-        <!-- SECTION 8: WHO IS BUYING? -->
-        <div class="metric-section">
-            <h2>🏢 Who Is Buying? Owners vs. Investors by Zip</h2>
-            <p>Share of sales in the past 12 months estimated to be investors (non-homesteaded purchasers). High investor share can mean more competition for owner-occupant buyers.</p>
-            {% if investor_activity|length > 0 %}
-            <table>
-                <thead>
-                    <tr>
-                        <th>Zip</th>
-                        <th>Total Sales</th>
-                        <th>Estimated Investor Share</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for row in investor_activity %}
-                    <tr>
-                        <td><strong>{{ row.zip }}</strong></td>
-                        <td>{{ row.total_sales }}</td>
-                        <td>
-                            <span class="badge {% if row.investor_share > 0.6 %}badge-warning{% elif row.investor_share < 0.3 %}badge-success{% else %}badge-neutral{% endif %}">
-                                {{ "{:.0%}".format(row.investor_share) }}
-                            </span>
-                            <span style="display: inline-block; background: #fef3c7; height: 8px; width: {{ [100, (row.investor_share * 100)|int]|min }}px; vertical-align: middle; margin-left: 6px; border-radius: 2px;"></span>
-                        </td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            <div class="insight-box">
-                <strong>Note:</strong> "Investor" is estimated from the absence of a homestead exemption at the time
-                of the latest county data pull. This includes vacation homes, second homes, and short-term rentals
-                alongside traditional investment properties — it's a proxy, not a definitive count.
-            </div>
-            {% else %}
-            <div class="no-data">Investor activity data unavailable (county data required)</div>
-            {% endif %}
-        </div>
-
-        {% endif %}
-
-        <div class="footer">
-            <strong>⚙️ Pipeline Health:</strong><br>
-            {% if stats.zillow_status %}<span class="{{ 'badge-success' if stats.zillow_status == 'OK' else 'badge-danger' }}">Zillow: {{ stats.zillow_status }}</span> {% endif %}
-            {% if stats.redfin_status %}<span class="{{ 'badge-success' if stats.redfin_status == 'OK' else 'badge-danger' }}">Redfin: {{ stats.redfin_status }}</span> {% endif %}
-            {% if stats.scpa_status %}<span class="{{ 'badge-success' if stats.scpa_status == 'OK' else 'badge-danger' }}">SCPA: {{ stats.scpa_status }}</span> {% endif %}
-            <br>
-            Execution Time: {{ stats.execution_time }}<br>
-            <br>
-            <em>Generated weekly by a serverless ETL pipeline. Data sourced from Redfin Data Center, Zillow Research, and Sarasota County Property Appraiser.</em>
-        </div>
-    </div>
-</body>
-</html>
-"""
+
+class MinifyingLoader(FileSystemLoader):
+    """
+    FileSystemLoader that minifies template source before Jinja compiles it.
+    
+    The indentation and comments never reach the generated code, so every
+    render (and every email and archived report) is smaller at no per-render
+    cost. None of the templates use <pre> or whitespace-sensitive literals.
+    """
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        return _minify_html(source), filename, uptodate
 
 
-def render_email(results: dict, stats: dict, is_degraded: bool = False, error_log: str = "") -> str:
+def _bytecode_cache() -> FileSystemBytecodeCache:
     """
-    Render HTML email from transformation results (V4).
+    Bytecode cache for compiled templates.
+    
+    Uses $SRQ_TEMPLATE_CACHE when set, so a directory that persists between
+    runs (e.g. one restored by CI) lets a cold process skip Jinja's
+    lex/parse/compile entirely; otherwise Jinja's per-user temp directory.
+    """
+    cache_dir = os.environ.get("SRQ_TEMPLATE_CACHE")
+    if cache_dir:
+        cache_dir = os.path.expanduser(cache_dir)
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(cache_dir)
+
+
+# Compiled once per process; trim_blocks/lstrip_blocks drop the whitespace
+# left behind by block tags, autoescape covers free-text fields like error_log.
+# Templates never change while the pipeline runs, so skip Jinja's staleness checks;
+# the bytecode cache lets later runs skip compilation as well.
+_ENV = Environment(
+    loader=MinifyingLoader(TEMPLATE_DIR),
+    bytecode_cache=_bytecode_cache(),
+    autoescape=True,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+)
+# Every email and archived report carries the CSS, so minify it once at import
+_ENV.globals['css'] = Markup(_minify_css((TEMPLATE_DIR / "email.css").read_text(encoding='utf-8')))
+_TEMPLATE = _ENV.get_template("email.html")
+_DEGRADED_TEMPLATE = _ENV.get_template("degraded.html")
+
+
+def format_column(series: pd.Series, spec: str, missing: str = 'N/A') -> pd.Series:
+    """
+    Format a numeric column to display strings in one pass.
+
+    NaN/None become `missing`, so the template needs no per-cell null checks.
+    Works on the column's native Python values: for report-sized tables the
+    mask/map/reindex round trip through pandas costs several times more than
+    the format calls themselves.
+    """
+    fmt = spec.format
+    present = series.notna().tolist()
+    return pd.Series(
+        [fmt(v) if ok else missing for v, ok in zip(series.tolist(), present)],
+        index=series.index,
+        dtype=object,
+    )
+
+
+def format_columns(df: pd.DataFrame, formats: dict) -> pd.DataFrame:
+    """Return a copy of df with a '<column>_fmt' column for each configured format."""
+    if df is None or df.empty or not formats:
+        return df
+    return df.assign(**{
+        f"{col}_fmt": format_column(df[col], spec, missing)
+        for col, (spec, missing) in formats.items()
+        if col in df.columns
+    })
+
+
+def badge_column(series: pd.Series, high: float, high_class: str, low: float, low_class: str) -> pd.Series:
+    """
+    Map a numeric column to badge CSS classes with two vectorized masks.
+
+    NaN fails both comparisons and stays 'badge-neutral'.
+    """
+    return (
+        pd.Series('badge-neutral', index=series.index)
+        .mask(series < low, low_class)
+        .mask(series > high, high_class)
+    )
+
+
+def badge_html(classes: pd.Series, text: pd.Series) -> list:
+    """
+    Build the badge <span> for each row as Markup, so Jinja emits it without escaping.
+    
+    The class and text are escaped once here; both come from fixed class names
+    and pre-formatted numbers, so this is effectively a copy.
+    """
+    span = Markup('<span class="badge {}">{}</span>')
+    return [span.format(cls, txt) for cls, txt in zip(classes.tolist(), text.tolist())]
+
+
+def derive_columns(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Return a copy of df with the display columns configured for table `name`.
+
+    Adds '<column>_fmt' strings (COLUMN_FORMATS), insight-box strings
+    (INSIGHT_FORMATS), '<column>_badge' classes and spans (BADGE_CLASSES) and
+    '<column>_bar' widths (BAR_WIDTHS), so the template only substitutes
+    values instead of formatting or evaluating branches. TRUSTED_COLUMNS are
+    marked safe in place.
+    """
+    df = format_columns(df, COLUMN_FORMATS.get(name))
+    if df is None or df.empty:
+        return df
+    derived = {
+        out: format_column(df[col] * scale, spec)
+        for out, (col, scale, spec) in INSIGHT_FORMATS.get(name, {}).items()
+        if col in df.columns
+    }
+    derived.update({
+        col: df[col].map(Markup, na_action='ignore')
+        for col in TRUSTED_COLUMNS.get(name, ())
+        if col in df.columns
+    })
+    for col, rule in BADGE_CLASSES.get(name, {}).items():
+        if col in df.columns:
+            derived[f"{col}_badge"] = badge_column(df[col], *rule)
+            derived[f"{col}_badge_html"] = badge_html(derived[f"{col}_badge"], df[f"{col}_fmt"])
+    derived.update({
+        f"{col}_bar": (df[col] * max_px).fillna(0).astype(int).clip(upper=max_px)
+        for col, max_px in BAR_WIDTHS.get(name, {}).items()
+        if col in df.columns
+    })
+    return df.assign(**derived) if derived else df
+
+
+def df_to_list(df) -> list:
+    """
+    Convert a DataFrame to a list of row namedtuples for template rendering.
+    
+    None or empty input returns the shared _NO_ROWS sentinel (an empty tuple)
+    without touching pandas.
+
+    Pulls each column out once with Series.tolist() (native Python scalars in
+    one C loop) and zips the columns into rows, instead of to_dict('records')
+    boxing every cell individually. Rows are namedtuples, so `row.field` in
+    the template is a slot lookup with no per-row dict to build or hash.
+    Missing values (NaN/NA/NaT) become None so templates can test truthiness.
+    """
+    if df is None or df.empty:
+        return _NO_ROWS
+    columns = df.columns.tolist()
+    Row = namedtuple('Row', columns, rename=True)
+    values = []
+    for col in columns:
+        series = df[col]
+        column = series.tolist()
+        if series.hasnans:
+            # NaN is truthy; None makes `{% if row.x %}` mean "present"
+            column = [None if missing else v for v, missing in zip(column, series.isna().tolist())]
+        values.append(column)
+    return list(map(Row._make, zip(*values)))
+
+
+def table_rows(name: str, df) -> list:
+    """Derive a table's display columns and convert it to template rows."""
+    return df_to_list(derive_columns(df, name))
+
+
+def format_snapshot(snapshot):
+    """Return a copy of the market snapshot dict with its headline figures pre-formatted."""
+    if not snapshot:
+        return snapshot
+    formatted = dict(snapshot)
+    for key, spec in SNAPSHOT_FORMATS.items():
+        value = snapshot.get(key)
+        formatted[f"{key}_fmt"] = spec.format(value) if value and pd.notna(value) else None
+    return formatted
+
+
+def build_context(results: dict, stats: dict, is_degraded: bool = False, error_log: str = "",
+                  date: str = None) -> dict:
+    """
+    Build the template context from transformation results.
     
     Args:
         results: Dict of DataFrames from transform.py
         stats: Pipeline execution statistics
         is_degraded: Whether pipeline is in degraded mode
         error_log: Error messages if degraded
+        date: Report date for the header (defaults to today, "%B %d, %Y")
         
     Returns:
-        Rendered HTML string
+        dict: Keyword arguments for the email template
     """
-    template = Template(EMAIL_TEMPLATE)
-    
-    # Convert DataFrames to list of dicts for template rendering
-    def df_to_list(df):
-        if df is None or len(df) == 0:
-            return []
-        return df.to_dict('records')
-    
-    flip_df = results.get('flip_detector', pd.DataFrame())
-    profitable_flips = df_to_list(flip_df[flip_df['outcome'] == 'PROFITABLE']) if not flip_df.empty else []
-    loss_flips = df_to_list(flip_df[flip_df['outcome'] == 'LOSS']) if not flip_df.empty else []
-
-    rendered = template.render(
-        date=datetime.now().strftime("%B %d, %Y"),
-        is_degraded=is_degraded,
-        error_log=error_log,
-        price_pressure=df_to_list(results.get('price_pressure', pd.DataFrame())),
-        inventory=df_to_list(results.get('inventory_absorption', pd.DataFrame())),
-        trend_lines=df_to_list(results.get('trend_lines', pd.DataFrame())),
-        buyer_value_index=df_to_list(results.get('buyer_value_index', pd.DataFrame())),
-        zip_price_trends=df_to_list(results.get('zip_price_trends', pd.DataFrame())),
-        assessment_ratio=df_to_list(results.get('assessment_ratio', pd.DataFrame())),
-        profitable_flips=profitable_flips,
-        loss_flips=loss_flips,
+    if date is None:
+        date = datetime.now().strftime("%B %d, %Y")
+
+    if is_degraded:
+        # The degraded template has no metric sections - skip table conversion
+        return dict(
+            date=date,
+            error_log=error_log,
+            stats=stats,
+        )
+
+    # Missing keys stay None - df_to_list handles that without building empty frames
+    flip_df = results.get('flip_detector')
+    has_flips = flip_df is not None and not flip_df.empty
+    frames = {name: results.get(key) for name, key in TABLE_SECTIONS.items()}
+    # Split flips by outcome in one pass; rows keep their original order in each group.
+    # Flip tables only show the first few rows, so cap before formatting/conversion.
+    by_outcome = dict(tuple(flip_df.groupby('outcome', sort=False))) if has_flips else {}
+    for name, outcome in (('profitable_flips', 'PROFITABLE'), ('loss_flips', 'LOSS')):
+        group = by_outcome.get(outcome)
+        frames[name] = group.head(MAX_FLIP_ROWS) if group is not None else None
+
+    # The conversions are independent; only fan out when there are enough
+    # rows for the pool to pay for itself.
+    total_rows = sum(len(df) for df in frames.values() if df is not None)
+    if total_rows > PARALLEL_ROW_THRESHOLD:
+        with ThreadPoolExecutor(max_workers=len(frames)) as pool:
+            futures = {name: pool.submit(table_rows, name, df) for name, df in frames.items()}
+            tables = {name: future.result() for name, future in futures.items()}
+    else:
+        tables = {name: table_rows(name, df) for name, df in frames.items()}
+
+    return dict(
+        date=date,
         flip_summary=results.get('flip_summary', 'No flips detected'),
-        investor_activity=df_to_list(results.get('investor_activity', pd.DataFrame())),
-        market_snapshot=results.get('market_snapshot', None),
-        stats=stats
+        market_snapshot=format_snapshot(results.get('market_snapshot')),
+        stats=stats,
+        **tables
     )
+
+
+def render_email(results: dict, stats: dict, is_degraded: bool = False, error_log: str = "",
+                 date: str = None) -> str:
+    """
+    Render HTML email from transformation results (V4).
+    
+    Args:
+        results: Dict of DataFrames from transform.py
+        stats: Pipeline execution statistics
+        is_degraded: Whether pipeline is in degraded mode
+        error_log: Error messages if degraded
+        date: Report date for the header (defaults to today)
+        
+    Returns:
+        Rendered HTML string
+    """
+    template = _DEGRADED_TEMPLATE if is_degraded else _TEMPLATE
+    return template.render(**build_context(results, stats, is_degraded, error_log, date))
+
+
+def render_email_to_file(results: dict, stats: dict, path, is_degraded: bool = False, error_log: str = ""):
+    """
+    Render the HTML report straight to disk.
+    
+    Streams the template output in chunks instead of building the whole
+    document as one string first. Use this when no email body is needed.
+    
+    Args:
+        results: Dict of DataFrames from transform.py
+        stats: Pipeline execution statistics
+        path: Output file path
+        is_degraded: Whether pipeline is in degraded mode
+        error_log: Error messages if degraded
+    """
+    template = _DEGRADED_TEMPLATE if is_degraded else _TEMPLATE
+    context = build_context(results, stats, is_degraded, error_log)
+    template.stream(**context).dump(str(path), encoding='utf-8')
+
+
+class SMTPSession:
+    """
+    One authenticated Gmail SMTP connection, reused for every message sent through it.
     
-    return rendered
+    Anything sending more than one message (retries, extra reports) should
+    send them all inside a single session rather than paying the TLS
+    handshake and AUTH round trips per message. Before reusing the
+    connection, send() pings it with NOOP and reconnects if the server has
+    dropped it.
+    
+    Usage:
+        with SMTPSession(user, password) as session:
+            session.send(message)
+    """
+
+    def __init__(self, user: str, password: str):
+        self.user = user
+        self.password = password
+        self.server = None
+        self._used = False
+
+    def connect(self):
+        """Open a fresh connection and log in, closing any previous one."""
+        import smtplib  # Deferred: pulls in ssl, only needed on the send path
+
+        self.close()
+        # Explicit local_hostname skips the reverse-DNS lookup smtplib does for EHLO
+        self.server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, local_hostname=socket.gethostname())
+        self.server.ehlo()
+        self.server.login(self.user, self.password)
+        self._used = False
+
+    def is_alive(self) -> bool:
+        """Return True if the open connection still answers NOOP with 250."""
+        if self.server is None:
+            return False
+        try:
+            return self.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def send(self, message):
+        """
+        Send one message, reconnecting first if a reused connection has gone stale.
+        
+        A disconnect mid-send is retried once on a fresh connection. After each
+        message the session is RSET so the next one starts from a clean envelope;
+        the message is already accepted by then, so a failed RSET only drops
+        the connection (the next send reconnects) instead of failing the send.
+        """
+        import smtplib
+
+        # A fresh login is known-good; only pay the NOOP round trip on reuse
+        if self.server is None or (self._used and not self.is_alive()):
+            self.connect()
+        try:
+            self.server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            logger.warning("SMTP connection dropped mid-send, reconnecting")
+            self.connect()
+            self.server.send_message(message)
+        try:
+            self.server.rset()
+        except OSError as e:  # SMTPException and socket errors alike
+            logger.warning(f"SMTP RSET failed after send, dropping connection: {e}")
+            self.close()
+            return
+        self._used = True
+
+    def close(self):
+        """QUIT the connection if one is open; errors on a dead socket are ignored."""
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# Process-wide session shared by send_email; connects on first send, QUIT at exit
+_SMTP_SESSION = None
+
+
+def get_smtp_session(user: str, password: str) -> SMTPSession:
+    """Return the shared SMTPSession for these credentials, replacing one for another account."""
+    global _SMTP_SESSION
+    if _SMTP_SESSION is None or (_SMTP_SESSION.user, _SMTP_SESSION.password) != (user, password):
+        close_smtp_session()
+        _SMTP_SESSION = SMTPSession(user, password)
+    return _SMTP_SESSION
+
+
+@atexit.register
+def close_smtp_session():
+    """Close the shared SMTP session, if one was opened."""
+    global _SMTP_SESSION
+    if _SMTP_SESSION is not None:
+        _SMTP_SESSION.close()
+        _SMTP_SESSION = None
+
+
+def email_configured() -> bool:
+    """Return True if every environment variable send_email needs is set."""
+    return all(os.environ.get(var) for var in ("GMAIL_USER", "GMAIL_APP_PASSWORD", "EMAIL_TO"))
 
 
 def send_email(html_content: str, subject: str) -> bool:
@@ -750,7 +569,10 @@ def send_email(html_content: str, subject: str) -> bool:
     Requires environment variables:
     - GMAIL_USER: Your Gmail address (e.g., yourname@gmail.com)
     - GMAIL_APP_PASSWORD: Gmail app password (not your regular password!)
-    - EMAIL_TO: Recipient email address
+    - EMAIL_TO: Recipient email address, or several separated by commas
+    
+    All recipients are delivered in one SMTP transaction on the shared
+    session: one MAIL FROM, a RCPT TO per address, and a single DATA upload.
     
     Args:
         html_content: Rendered HTML email
@@ -775,23 +597,29 @@ def send_email(html_content: str, subject: str) -> bool:
         logger.error("EMAIL_TO environment variable not set")
         return False
     
+    recipients = [addr.strip() for addr in email_to.split(",") if addr.strip()]
+    
+    from email.message import EmailMessage
+    from email.utils import make_msgid
+    
     try:
         # Create message
-        message = MIMEMultipart('alternative')
+        message = EmailMessage()
         message['Subject'] = subject
         message['From'] = gmail_user
-        message['To'] = email_to
+        message['To'] = ", ".join(recipients)
+        message['Message-ID'] = make_msgid(domain=gmail_user.partition('@')[2] or None)
         
-        # Attach HTML content
-        html_part = MIMEText(html_content, 'html')
-        message.attach(html_part)
+        # Single text/html part - no multipart wrapper or boundary to generate.
+        # The minified report is one long, mostly-ASCII line: quoted-printable
+        # keeps it near its raw size and wraps it under SMTP's line limit
+        # (8bit would leave the line unwrapped; base64 inflates it by a third).
+        message.set_content(html_content, subtype='html', cte='quoted-printable')
         
-        # Connect to Gmail SMTP server
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(gmail_user, gmail_password)
-            server.send_message(message)
+        # Reuse the process-wide Gmail connection (opened on the first send)
+        get_smtp_session(gmail_user, gmail_password).send(message)
         
-        logger.info(f"✅ Email sent successfully to {email_to}")
+        logger.info(f"✅ Email sent successfully to {', '.join(recipients)}")
         return True
         
     except Exception as e:
@@ -799,6 +627,29 @@ def send_email(html_content: str, subject: str) -> bool:
         return False
 
 
+def read_error_log_tail(path, max_bytes: int = ERROR_LOG_TAIL_BYTES) -> str:
+    """
+    Read the last max_bytes of the error log, marking it when older lines are cut.
+    
+    Args:
+        path: Error log path
+        max_bytes: Number of trailing bytes to keep
+        
+    Returns:
+        str: Log tail, or "" if the file does not exist
+    """
+    try:
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - max_bytes))
+            tail = f.read()
+    except FileNotFoundError:
+        return ""
+    # A mid-character cut at the seek point decodes to a replacement char
+    text = tail.decode("utf-8", errors="replace")
+    return f"...(truncated)\n{text}" if size > max_bytes else text
+
+
 def deliver_report(results: dict, stats: dict, is_degraded: bool = False):
     """
     Render and send the weekly market pulse report (V4).
@@ -812,19 +663,23 @@ def deliver_report(results: dict, stats: dict, is_degraded: bool = False):
     logger.info("STARTING EMAIL DELIVERY (V4 WEEKLY FORMAT)")
     logger.info("=" * 60)
     
+    # A degraded email is never archived, so without credentials there is
+    # nothing to use the rendered HTML for
+    if is_degraded and not email_configured():
+        logger.error("Email environment variables not set - skipping degraded alert")
+        return False, ""
+    
     # Load error log if degraded
-    error_log = ""
-    if is_degraded:
-        error_log_path = Path("data/errors.log")
-        if error_log_path.exists():
-            with open(error_log_path, "r") as f:
-                error_log = f.read()
+    error_log = read_error_log_tail(Path("data/errors.log")) if is_degraded else ""
+    
+    # One timestamp for both the report header and the subject line
+    now = datetime.now()
     
     # Render email
-    html_content = render_email(results, stats, is_degraded, error_log)
+    html_content = render_email(results, stats, is_degraded, error_log, date=now.strftime("%B %d, %Y"))
     
     # Determine subject line (V4: weekly format)
-    week_of = datetime.now().strftime("%b %d, %Y")
+    week_of = now.strftime("%b %d, %Y")
     if is_degraded:
         subject = f"⚠️ SRQ Pulse — Pipeline Degraded — Week of {week_of}"
     else:
@@ -855,10 +710,6 @@ if __name__ == "__main__":
             {'month': 'Jan 2026', 'zhvi': 450000, 'zori': 2200, 'flow_ratio': 0.0586, 'direction': '↑ Expanding'},
             {'month': 'Dec 2025', 'zhvi': 455000, 'zori': 2180, 'flow_ratio': 0.0575, 'direction': '→ Flat'}
         ]),
-        'cash_flow_zones': pd.DataFrame([
-            {'rank': 1, 'zip': 34231, 'avg_assessed': 350000, 'est_annual_rent': 26400, 'cash_flow_ratio': 0.0754},
-            {'rank': 2, 'zip': 34233, 'avg_assessed': 420000, 'est_annual_rent': 26400, 'cash_flow_ratio': 0.0628}
-        ]),
         'zip_price_trends': pd.DataFrame([
             {'zip': 34231, 'price_now': 450000, 'price_prior': 420000, 'yoy_change': 0.071, 'sales_volume': 120}
         ]),
@@ -866,10 +717,8 @@ if __name__ == "__main__":
             {'zip': 34231, 'median_ratio': 1.15, 'meaning': 'Stable/Hot (above assessed)'},
             {'zip': 34233, 'median_ratio': 0.92, 'meaning': 'Market cooling (below assessed)'}
         ]),
-        'profitable_flips': pd.DataFrame([
-            {'account': '123456', 'first_sale_date': 'Aug 12', 'first_sale_price': 250000, 'second_sale_date': 'Feb 05', 'second_sale_price': 385000, 'markup_pct': 0.54, 'outcome': 'PROFITABLE'}
-        ]),
-        'loss_flips': pd.DataFrame([
+        'flip_detector': pd.DataFrame([
+            {'account': '123456', 'first_sale_date': 'Aug 12', 'first_sale_price': 250000, 'second_sale_date': 'Feb 05', 'second_sale_price': 385000, 'markup_pct': 0.54, 'outcome': 'PROFITABLE'},
             {'account': '789012', 'first_sale_date': 'Sep 10', 'first_sale_price': 400000, 'second_sale_date': 'Jan 20', 'second_sale_price': 380000, 'markup_pct': -0.05, 'outcome': 'LOSS'}
         ]),
         'flip_summary': '2 total — 1 profitable, 1 loss',
@@ -885,7 +734,5 @@ if __name__ == "__main__":
         'execution_time': '12.4s'
     }
     
-    html = render_email(mock_results, mock_stats)
-    with open("test_report.html", "w", encoding="utf-8") as f:
-        f.write(html)
+    render_email_to_file(mock_results, mock_stats, "test_report.html")
     print("Created test_report.html")
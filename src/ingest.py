@@ -15,13 +15,26 @@ V4 Changes:
 import os
 import io
 import re
+import csv
 import zipfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except ImportError:  # Optional speedup; pandas parses the same files
+    pa = pacsv = pc = None
 
 # Configure logging
 logging.basicConfig(
@@ -33,11 +46,50 @@ logger = logging.getLogger(__name__)
 # Sarasota zip codes for filtering Zillow data
 SARASOTA_ZIPS = [34230, 34231, 34232, 34233, 34234, 34235, 34236, 34237, 34238, 34239, 34240, 34242, 34243]
 
+# PyArrow parse block size for the SCPA CSVs (bytes per parallel parse task)
+SCPA_CSV_BLOCK_SIZE = 32 << 20
+
+# SCPA date columns, read as text by both parsers: pandas leaves them as
+# strings, while Arrow would infer timestamps and rewrite them on output
+SCPA_DATE_COLUMNS = ['SaleDate', 'SALE_DATE']
+
+# Rows per pandas chunk when the sales history is filtered while it is read
+SCPA_CSV_CHUNK_ROWS = 500_000
+
+# Bytes per write while streaming the SCPA ZIP download to disk
+SCPA_DOWNLOAD_CHUNK_BYTES = 1 << 20
+
+# SCPA columns kept at ingest; the rest are skipped by the CSV parser.
+# Sales keep what transform.py reads plus DeedType, which ingest filters on.
+PARCEL_COLUMNS = [
+    'ACCOUNT', 'LOCN', 'LOCS', 'LOCD', 'UNIT', 'LOCCITY', 'LOCZIP',
+    'LIVING', 'BEDR', 'BATH', 'YRBL', 'JUST', 'ASSD', 'SALE_AMT', 'SALE_DATE',
+    'HOMESTEAD'
+]
+SALES_COLUMNS = ['Account', 'SaleDate', 'SalePrice', 'DeedType']
+
+# (connect, read) timeouts in seconds for every download
+HTTP_TIMEOUT = (10, 120)
+
+# Shared HTTP session: keeps TLS connections alive between downloads from the
+# same host (ZHVI then ZORI) and retries connection errors and 429/5xx
+# responses with exponential backoff instead of failing the source outright
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
 # Global flags for pipeline health monitoring
+# (each is only ever set by its own source's ingest function)
 ZILLOW_FAILED = False
 REDFIN_FAILED = False
 SCPA_FAILED = False
 
+# Sources ingest concurrently, so serialize appends to data/errors.log
+_ERROR_LOG_LOCK = threading.Lock()
+
 
 def log_error(message: str):
     """Log errors to data/errors.log for degraded mode notifications."""
@@ -45,12 +97,83 @@ def log_error(message: str):
     error_log_path = Path("data/errors.log")
     
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(error_log_path, "a") as f:
+    with _ERROR_LOG_LOCK, open(error_log_path, "a") as f:
         f.write(f"[{timestamp}] {message}\n")
     
     logger.error(message)
 
 
+def read_scpa_csv(zf: zipfile.ZipFile, member: str, columns: list = None, where: tuple = None,
+                  dtype=None) -> pd.DataFrame:
+    """
+    Parse one CSV from the SCPA ZIP into a DataFrame.
+    
+    Uses PyArrow's multithreaded C++ reader when pyarrow is installed, and
+    pandas otherwise. If Arrow rejects the file (ArrowInvalid, e.g. a row
+    it cannot tokenize or convert) the member is re-read with pandas, so the
+    speedup never costs a failed run. latin-1 maps every byte, so Arrow's
+    transcoding never needs the replacement characters pandas is allowed.
+    
+    pandas never parses dates, so SCPA_DATE_COLUMNS are pinned to strings for
+    Arrow; if Arrow still infers a date/time type for any other column, the
+    pandas result is used so the CSVs written from it keep their format.
+    
+    Unwanted columns are dropped by the parser itself, and the `where` filter
+    runs before the full file is ever a DataFrame: on the Arrow table, or
+    chunk by chunk with pandas.
+    
+    Args:
+        zf: Open SCPA ZIP archive
+        member: Path of the CSV inside the archive
+        columns: Columns to keep, in file order; names the file lacks are
+            ignored. None keeps every column.
+        where: Optional (column, value) pair; only rows equal to value are kept
+        dtype: str reads every kept column as text, passed through unchanged.
+            Needed with `where` for stable output: pandas then reads in
+            chunks, and each chunk would otherwise infer its own dtypes.
+        
+    Returns:
+        pd.DataFrame: The selected columns and rows of the CSV
+    """
+    if columns is not None or dtype is str:
+        with zf.open(member) as csv_file:
+            header = next(csv.reader(io.TextIOWrapper(csv_file, encoding='latin-1')), [])
+        if columns is not None:
+            wanted = set(columns)
+            columns = [col for col in header if col in wanted]
+    
+    if pacsv is not None:
+        text_columns = (columns if columns is not None else header) if dtype is str else SCPA_DATE_COLUMNS
+        try:
+            with zf.open(member) as csv_file:
+                table = pacsv.read_csv(
+                    csv_file,
+                    read_options=pacsv.ReadOptions(encoding='latin1', block_size=SCPA_CSV_BLOCK_SIZE),
+                    convert_options=pacsv.ConvertOptions(
+                        include_columns=columns,
+                        column_types={col: pa.string() for col in text_columns},
+                    ),
+                )
+            temporal = [field.name for field in table.schema if pa.types.is_temporal(field.type)]
+            if temporal:
+                raise pa.ArrowTypeError(f"date/time columns {temporal} would not round-trip as text")
+            if where is not None:
+                col, value = where
+                table = table.filter(pc.equal(table[col], value))
+            return table.to_pandas(self_destruct=True)
+        except pa.ArrowException as e:
+            logger.warning(f"PyArrow could not parse {member}, falling back to pandas: {e}")
+    
+    with zf.open(member) as csv_file:
+        if where is None:
+            return pd.read_csv(csv_file, usecols=columns, dtype=dtype, low_memory=False,
+                               encoding='latin-1', encoding_errors='replace')
+        col, value = where
+        chunks = pd.read_csv(csv_file, usecols=columns, dtype=dtype, chunksize=SCPA_CSV_CHUNK_ROWS,
+                             encoding='latin-1', encoding_errors='replace')
+        return pd.concat([chunk[chunk[col] == value] for chunk in chunks], ignore_index=True)
+
+
 def ingest_zillow_data() -> bool:
     """
     Download Zillow ZHVI (home values) and ZORI (rent index) from Zillow Research Data.
@@ -69,7 +192,7 @@ def ingest_zillow_data() -> bool:
         # ZHVI: County-level, Mid-Tier Homes (SFR, Condo/Co-op), Smoothed, Seasonally Adjusted
         ZHVI_URL = "https://files.zillowstatic.com/research/public_csvs/zhvi/County_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv"
         
-        response = requests.get(ZHVI_URL, timeout=120)
+        response = _HTTP.get(ZHVI_URL, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
         
         logger.info(f"Downloaded ZHVI ({len(response.content) / 1024 / 1024:.2f} MB)")
@@ -94,7 +217,7 @@ def ingest_zillow_data() -> bool:
         # ZORI: County-level, All Homes Plus Multifamily, Smoothed
         ZORI_URL = "https://files.zillowstatic.com/research/public_csvs/zori/County_zori_uc_sfrcondomfr_sm_month.csv"
         
-        response = requests.get(ZORI_URL, timeout=120)
+        response = _HTTP.get(ZORI_URL, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
         
         logger.info(f"Downloaded ZORI ({len(response.content) / 1024 / 1024:.2f} MB)")
@@ -207,7 +330,7 @@ def ingest_redfin_via_playwright() -> bool:
         bool: True if successful, False if failed
     """
     try:
-        from redfin_scraper import download_all_tabs
+        from .redfin_scraper import download_all_tabs
         return download_all_tabs()
     except Exception as e:
         log_error(f"Redfin Playwright failed: {e}")
@@ -286,42 +409,37 @@ def ingest_county_data() -> bool:
     try:
         logger.info("Downloading Sarasota County data from sc-pa.com...")
         
-        # Download the ZIP file
-        response = requests.get(SCPA_ZIP_URL, timeout=120)
-        response.raise_for_status()
-        
-        logger.info(f"Downloaded {len(response.content) / 1024 / 1024:.2f} MB ZIP file")
-        
-        # Extract ZIP in memory
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-            # Load parcel records (full property details)
-            logger.info("Extracting Sarasota.csv...")
-            with zf.open("Parcel_Sales_CSV/Sarasota.csv") as csv_file:
-                parcels_df = pd.read_csv(csv_file, low_memory=False, encoding='latin-1', encoding_errors='replace')
+        # Stream the ZIP to a temp file (removed on close) rather than holding
+        # the whole download, plus a BytesIO copy of it, in memory
+        with tempfile.TemporaryFile(suffix=".zip") as zip_file:
+            with _HTTP.get(SCPA_ZIP_URL, timeout=HTTP_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=SCPA_DOWNLOAD_CHUNK_BYTES):
+                    zip_file.write(chunk)
             
-            # Load sales transaction history
-            logger.info("Extracting ParcelSales.csv...")
-            with zf.open("Parcel_Sales_CSV/ParcelSales.csv") as csv_file:
-                sales_df = pd.read_csv(csv_file, low_memory=False, encoding='latin-1', encoding_errors='replace')
+            logger.info(f"Downloaded {zip_file.tell() / 1024 / 1024:.2f} MB ZIP file")
+            
+            with zipfile.ZipFile(zip_file) as zf:
+                # Load parcel records (full property details)
+                logger.info("Extracting Sarasota.csv...")
+                # Only the useful columns are parsed (PARCEL_COLUMNS)
+                parcels_df = read_scpa_csv(zf, "Parcel_Sales_CSV/Sarasota.csv", columns=PARCEL_COLUMNS)
+                
+                # Load sales transaction history, keeping only Warranty Deeds
+                # (real arm's-length transactions) as it is parsed
+                logger.info("Extracting ParcelSales.csv (DeedType == 'WD' only)...")
+                sales_df = read_scpa_csv(
+                    zf, "Parcel_Sales_CSV/ParcelSales.csv",
+                    columns=SALES_COLUMNS, where=('DeedType', 'WD'), dtype=str,
+                )
         
         # Filter and clean parcel data
         logger.info("Filtering parcel data to LOCCITY == 'SARASOTA'...")
         parcels_df['LOCCITY'] = parcels_df['LOCCITY'].astype(str).str.strip().str.upper()
-        parcels_df = parcels_df[parcels_df['LOCCITY'] == 'SARASOTA'].copy()
-        
-        # Keep only useful columns
-        parcel_columns = [
-            'ACCOUNT', 'LOCN', 'LOCS', 'LOCD', 'UNIT', 'LOCCITY', 'LOCZIP',
-            'LIVING', 'BEDR', 'BATH', 'YRBL', 'JUST', 'ASSD', 'SALE_AMT', 'SALE_DATE',
-            'HOMESTEAD'
-        ]
-        # Only keep columns that exist
-        parcel_columns = [col for col in parcel_columns if col in parcels_df.columns]
-        parcels_df = parcels_df[parcel_columns]
+        parcels_df = parcels_df[parcels_df['LOCCITY'] == 'SARASOTA']
         
-        # Filter sales to only Warranty Deeds (real arm's-length transactions)
-        logger.info("Filtering sales to DeedType == 'WD' (Warranty Deeds)...")
-        sales_df = sales_df[sales_df['DeedType'] == 'WD'].copy()
+        # Output keeps the PARCEL_COLUMNS order (columns the file lacks are skipped)
+        parcels_df = parcels_df[[col for col in PARCEL_COLUMNS if col in parcels_df.columns]]
         
         # Save processed data
         county_dir = Path("data/county")
@@ -346,7 +464,7 @@ def ingest_county_data() -> bool:
 
 def run_ingestion() -> bool:
     """
-    Run all data ingestion tasks (Zillow, Redfin, County).
+    Run all data ingestion tasks (Zillow, Redfin, County) concurrently.
     
     Returns:
         bool: True if at least one source succeeded (partial success OK)
@@ -355,9 +473,14 @@ def run_ingestion() -> bool:
     logger.info("STARTING DATA INGESTION (V4)")
     logger.info("=" * 60)
     
-    zillow_success = ingest_zillow_data()
-    redfin_success = ingest_redfin_data()
-    county_success = ingest_county_data()
+    # The sources are independent and mostly wait on network I/O (which
+    # releases the GIL), so wall time is the slowest source, not the sum
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        zillow = pool.submit(ingest_zillow_data)
+        redfin = pool.submit(ingest_redfin_data)
+        county = pool.submit(ingest_county_data)
+    
+    zillow_success, redfin_success, county_success = zillow.result(), redfin.result(), county.result()
     
     success_count = sum([zillow_success, redfin_success, county_success])
     
@@ -373,5 +496,6 @@ def run_ingestion() -> bool:
 
 
 if __name__ == "__main__":
+    # Run as a module from the repo root: python -m src.ingest
     success = run_ingestion()
     exit(0 if success else 1)
@@ -19,6 +19,11 @@ from datetime import datetime, timedelta
 
 import pandas as pd
 
+try:
+    import pyarrow  # Enables pandas' multithreaded pyarrow CSV engine
+except ImportError:  # Optional speedup; the default C parser reads the same files
+    pyarrow = None
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -36,6 +41,21 @@ def normalize_account_id(series: pd.Series) -> pd.Series:
     return series.astype(str).str.strip().str.lstrip('0')
 
 
+def read_county_csv(path: Path) -> pd.DataFrame:
+    """
+    Load one of the county CSVs written by ingest.py.
+    
+    Uses pandas' pyarrow engine (pyarrow is in requirements.txt, so this is
+    the path CI runs). It parses SaleDate straight to datetimes, which the
+    caller's to_datetime keeps as is; every other column comes out as the C
+    parser's whole-file inference would, which is what an install without
+    pyarrow falls back to.
+    """
+    if pyarrow is not None:
+        return pd.read_csv(path, engine='pyarrow')
+    return pd.read_csv(path, low_memory=False)
+
+
 def normalize_address(addr: str) -> str:
     """
     Normalize address for fuzzy matching across data sources.
@@ -489,8 +509,9 @@ def metric_flip_detector(sales_df: pd.DataFrame, parcels_df: pd.DataFrame) -> pd
                 return f"{addr}, Sarasota FL {zip5}".strip(', ')
 
             addr_lookup['address'] = addr_lookup.apply(build_address, axis=1)
-            addr_lookup['beds'] = pd.to_numeric(addr_lookup['BEDR'], errors='coerce')
-            addr_lookup['sqft'] = pd.to_numeric(addr_lookup['LIVING'], errors='coerce')
+            # 0 means "not recorded" in SCPA data - treat as missing for display
+            addr_lookup['beds'] = pd.to_numeric(addr_lookup['BEDR'], errors='coerce').where(lambda s: s > 0)
+            addr_lookup['sqft'] = pd.to_numeric(addr_lookup['LIVING'], errors='coerce').where(lambda s: s > 0)
 
             result['account_key'] = normalize_account_id(result['account'].astype(str))
             result = result.merge(
@@ -988,8 +1009,8 @@ def run_transformation() -> dict:
     # Load county data
     try:
         county_dir = Path("data/county")
-        parcels_df = pd.read_csv(county_dir / "county_parcels.csv", low_memory=False)
-        sales_df = pd.read_csv(county_dir / "county_sales.csv", low_memory=False)
+        parcels_df = read_county_csv(county_dir / "county_parcels.csv")
+        sales_df = read_county_csv(county_dir / "county_sales.csv")
         
         # Filter out nominal/non-arm's-length transfers (e.g., $100 deeds to Trusts)
         # These are usually not market sales and skew flip detection.